@@ -0,0 +1,479 @@
+"""
+molit_bot.py / molit_bot_now.py 공용 모듈
+(목록·상세 수집, 캐시, 텔레그램 전송)
+"""
+import os, re, sys, time, codecs, sqlite3, threading, requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from urllib.parse import urljoin
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+BASE = "https://www.molit.go.kr"
+LIST_PATH = "/USR/NEWS/m_71/lst.jsp"
+
+# 원하는 분야만: 주택토지, 국토도시, 일반
+CATEGORY_TO_SECTION = {
+    "주택토지": "p_sec_2",
+    "국토도시": "p_sec_9",
+    "일반": "p_sec_1",
+}
+
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+CHAT_ID   = os.getenv("CHAT_ID")  # 예: @MOLIT_bot 또는 숫자ID(-100...)
+TIMEOUT = 20
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (+Telegram notifier for MOLIT press releases)"
+}
+
+# 상세 페이지는 병렬로 받되, 동시에 나가는 요청 수는 제한(서버 부담 방지)
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))
+_HTTP_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENCY)
+MAX_RPS = float(os.getenv("MAX_RPS", "10"))  # 초당 최대 요청 수
+
+# 모든 요청이 같은 호스트(www.molit.go.kr)로 가므로 세션 하나로 연결(keep-alive) 재사용
+# (requests.Session은 스레드 간 GET 공유 가능, 풀 크기는 동시 요청 수에 맞춤)
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENCY))
+
+# 목록 페이지는 메뉴/스크립트가 대부분이라 게시물 표(<table>)만 파싱
+_LIST_STRAINER = SoupStrainer("table")
+
+class RateLimiter:
+    """
+    요청 간격이 1/rps초보다 짧아질 때만 대기 (여러 스레드에서 같이 사용)
+    """
+    def __init__(self, rps: float):
+        self.min_gap = 1.0 / rps
+        self.next_ok = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self.next_ok - now
+            self.next_ok = max(now, self.next_ok) + self.min_gap
+        if delay > 0:
+            time.sleep(delay)
+
+# 고정 sleep 대신 초당 요청 수로 서버 부담 제한
+_RATE = RateLimiter(MAX_RPS)
+
+@contextmanager
+def _http_slot():
+    # 동시 요청 수(_HTTP_SLOTS)와 초당 요청 수(_RATE)를 함께 지킴
+    with _HTTP_SLOTS:
+        _RATE.wait()
+        yield
+
+# 텔레그램 분할 전송도 api.telegram.org 연결 하나로 재사용
+_TG_SESSION = requests.Session()
+# 같은 채팅방으로 보내는 조각 사이 간격 (순서 유지 + 채팅방별 전송 제한)
+_TG_RATE = RateLimiter(1 / 0.3)
+
+MAX_CACHE = 300  # 캐시 항목 최대 보관 수
+
+def send(text: str):
+    if not BOT_TOKEN or not CHAT_ID:
+        raise RuntimeError("환경변수 BOT_TOKEN/CHAT_ID가 비어 있습니다.")
+    _TG_RATE.wait()
+    r = _TG_SESSION.post(
+        f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
+        data={"chat_id": CHAT_ID, "text": text, "disable_web_page_preview": True},
+        timeout=TIMEOUT
+    )
+    r.raise_for_status()
+
+def split_for_telegram(lines, limit: int = 3500):
+    """
+    줄 단위로 묶어 limit 글자를 넘지 않는 메시지 조각을 차례로 반환 (텔레그램 4096자 제한)
+    """
+    cur, buf = [], 0
+    for line in lines:
+        if cur and buf + len(line) + 1 > limit:
+            yield "\n".join(cur)
+            cur, buf = [], 0
+        cur.append(line); buf += len(line) + 1
+    if cur:
+        yield "\n".join(cur)
+
+def get_soup(url: str, params=None, cache: sqlite3.Connection = None, strainer: SoupStrainer = None):
+    """
+    cache가 주어지면 이전 응답의 ETag/Last-Modified로 조건부 요청,
+    304(변경 없음)이면 저장해 둔 HTML을 그대로 사용.
+    strainer를 주면 해당 부분만 파싱(목록은 <table>만 필요)
+    """
+    key = requests.Request("GET", url, params=params).prepare().url
+    cached = list_cache_get(cache, key) if cache is not None else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    with _http_slot():
+        r = SESSION.get(url, params=params, headers=headers, timeout=TIMEOUT)
+    if r.status_code == 304 and cached:
+        return BeautifulSoup(cached["html"], "lxml", parse_only=strainer)
+    r.raise_for_status()
+
+    if cache is not None:
+        etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+        if etag or last_modified:
+            list_cache_put(cache, key, etag, last_modified, r.text)
+        else:
+            list_cache_drop(cache, key)
+    return BeautifulSoup(r.text, "lxml", parse_only=strainer)
+
+def parse_list_rows(soup: BeautifulSoup):
+    """
+    목록 테이블에서 (제목, 링크, 분야, 등록일[YYYY-MM-DD]) 추출
+    """
+    rows = []
+    # 안내 문구 포함되어 있어도 a 태그가 있는 행면 충분
+    for a in soup.select("a[href*='dtl.jsp'][href*='id=']"):
+        title = a.get_text(strip=True)
+        href = a.get("href")
+        link = urljoin(BASE, href)
+
+        # 같은 행에서 '분야', '등록일' 텍스트가 같은 줄에 있음
+        tr = a.find_parent("tr")
+        if not tr:
+            continue
+        tds = [td.get_text(strip=True) for td in tr.find_all("td")]
+        # 일반적으로 [번호, 제목, 분야, 등록일, 조회]
+        if len(tds) >= 4:
+            category = tds[-3]  # '분야'
+            date_str = tds[-2]  # '등록일' (YYYY-MM-DD)
+        else:
+            category, date_str = "", ""
+
+        rows.append({
+            "title": title,
+            "link": link,
+            "category": category,
+            "date_str": date_str
+        })
+    return rows
+
+@lru_cache(maxsize=64)
+def _parse_ymd(s: str):
+    # 목록 한 페이지에는 날짜가 2~3종류뿐이라 문자열별로 한 번만 변환
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+_DATE_RE = re.compile(r"등록일\s*([0-9]{4}-[0-9]{2}-[0-9]{2}\s+[0-9]{2}:[0-9]{2})")
+
+def parse_detail_datetime_kst(detail_html: str):
+    """
+    상세 페이지에서 '등록일 2025-08-12 11:00' 형태를 찾아 datetime(KST) 변환
+    """
+    m = _DATE_RE.search(detail_html)
+    if not m:
+        return None
+    dt = datetime.strptime(m.group(1), "%Y-%m-%d %H:%M")
+    return dt.replace(tzinfo=ZoneInfo("Asia/Seoul"))
+
+# 본문 컨테이너 후보 (자주 쓰이는 것부터 순서대로), 한 번만 XPath로 컴파일
+_SUMMARY_CANDIDATES = [
+    "#viewCon", ".board_view", ".view", ".bo_view", ".bo_content", ".bo_text",
+    ".bbsView", ".contents", "#contents", "#content"
+]
+# 후보마다 트리 전체를 훑으므로 순서대로 평가하다 텍스트가 있는 첫 후보에서 멈춤
+# (MOLIT 상세는 대부분 #viewCon에서 끝남)
+_SUMMARY_XPATHS = [
+    etree.XPath(f"//*[@id='{sel[1:]}']") if sel.startswith("#")
+    else etree.XPath(f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {sel[1:]} ')]")
+    for sel in _SUMMARY_CANDIDATES
+]
+_WS_RE = re.compile(r"\s+")
+
+def _node_text(el) -> str:
+    # BeautifulSoup get_text(separator=" ", strip=True)와 같은 결과
+    return " ".join(t.strip() for t in el.itertext() if t.strip())
+
+def extract_summary(html: str, limit: int = 220) -> str:
+    """
+    상세 본문에서 텍스트를 모아 앞부분만 요약으로 사용.
+    다양한 게시판 스킨을 고려해 넓게 탐색 → 첫 1~2문장 정도 잘라냄.
+    (bs4 트리 대신 lxml로 바로 파싱)
+    """
+    try:
+        doc = lxml.html.fromstring(html)
+    except ValueError:
+        # XML 인코딩 선언이 붙은 문자열은 bytes로 넘겨야 파싱됨
+        doc = lxml.html.fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+    except etree.ParserError:
+        return ""
+    etree.strip_elements(doc, "script", "style", "template", etree.Comment, with_tail=False)
+
+    text = ""
+    for xpath in _SUMMARY_XPATHS:
+        nodes = xpath(doc)
+        if nodes:
+            text = _node_text(nodes[0])
+            if text:
+                break
+    if not text:
+        text = _node_text(doc)
+
+    # 공백 정리
+    text = _WS_RE.sub(" ", text)
+
+    # 너무 긴 건 앞부분만 사용
+    if len(text) > limit:
+        text = text[:limit].rstrip() + "…"
+    return text
+
+_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent(link TEXT PRIMARY KEY, dt TEXT, summary TEXT, ts INTEGER);
+CREATE TABLE IF NOT EXISTS details(link TEXT PRIMARY KEY, dt TEXT, summary TEXT, ts INTEGER);
+CREATE TABLE IF NOT EXISTS lists(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, html TEXT, ts INTEGER);
+"""
+
+_CACHE_LOCK = threading.Lock()  # 수집 스레드들이 연결 하나를 같이 쓰므로 직렬화
+
+def _connect_cache(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    try:
+        conn.executescript(_CACHE_SCHEMA)
+    except sqlite3.DatabaseError:
+        conn.close()
+        raise
+    return conn
+
+def open_cache(path: str) -> sqlite3.Connection:
+    """
+    sqlite3 캐시 (실행 간 유지, 전체 파일을 다시 쓰지 않고 행 단위로 갱신)
+      sent    : 발송한 글 (중복 발송 방지)
+      details : 파싱한 상세 페이지 결과 (게시 후 바뀌지 않으므로 만료 없음)
+      lists   : 목록 페이지 조건부 요청(304)용 ETag/Last-Modified와 HTML
+    파일이 DB가 아니면 <path>.bad로 옮겨 두고 새로 만들고,
+    그래도 열 수 없으면 경고 후 이번 실행만 메모리 캐시로 진행
+    """
+    try:
+        return _connect_cache(path)
+    except sqlite3.DatabaseError as e:
+        err = e
+    if os.path.isfile(path):
+        print(f"[cache] {path}는 DB가 아님 ({err}) → {path}.bad로 옮기고 새로 만듦", file=sys.stderr)
+        try:
+            os.replace(path, path + ".bad")
+            return _connect_cache(path)
+        except (OSError, sqlite3.DatabaseError) as e:
+            err = e
+    print(f"[cache] {path}를 열 수 없음 ({err}) → 이번 실행은 메모리 캐시로 진행 (저장·중복 발송 방지 안 됨)", file=sys.stderr)
+    return _connect_cache(":memory:")
+
+def commit_cache(conn: sqlite3.Connection):
+    """
+    지금까지 쌓인 캐시 변경을 파일에 반영 (이후 단계에서 실패해도 수집 결과는 남김)
+    """
+    with _CACHE_LOCK:
+        conn.commit()
+
+def close_cache(conn: sqlite3.Connection):
+    """
+    테이블별로 최근 MAX_CACHE개만 남기고 저장
+    """
+    with _CACHE_LOCK:
+        for table, key in (("sent", "link"), ("details", "link"), ("lists", "url")):
+            conn.execute(
+                f"DELETE FROM {table} WHERE {key} NOT IN (SELECT {key} FROM {table} ORDER BY ts DESC LIMIT ?)",
+                (MAX_CACHE,),
+            )
+        conn.commit()
+        conn.close()
+
+def is_sent(conn: sqlite3.Connection, link: str) -> bool:
+    with _CACHE_LOCK:
+        return conn.execute("SELECT 1 FROM sent WHERE link = ?", (link,)).fetchone() is not None
+
+def mark_sent(conn: sqlite3.Connection, link: str, dt: str, summary: str = None):
+    with _CACHE_LOCK:
+        conn.execute("INSERT OR REPLACE INTO sent VALUES (?, ?, ?, ?)", (link, dt, summary, time.time_ns()))
+
+def cache_get(conn: sqlite3.Connection, link: str):
+    with _CACHE_LOCK:
+        row = conn.execute("SELECT dt, summary FROM details WHERE link = ?", (link,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE details SET ts = ? WHERE link = ?", (time.time_ns(), link))  # 최근 사용(LRU)
+        return {"dt": row[0], "summary": row[1]}
+
+def cache_put(conn: sqlite3.Connection, link: str, value: dict):
+    with _CACHE_LOCK:
+        conn.execute(
+            "INSERT OR REPLACE INTO details VALUES (?, ?, ?, ?)",
+            (link, value["dt"], value.get("summary"), time.time_ns()),
+        )
+
+def list_cache_get(conn: sqlite3.Connection, url: str):
+    with _CACHE_LOCK:
+        row = conn.execute("SELECT etag, last_modified, html FROM lists WHERE url = ?", (url,)).fetchone()
+    return dict(zip(("etag", "last_modified", "html"), row)) if row else None
+
+def list_cache_put(conn: sqlite3.Connection, url: str, etag: str, last_modified: str, html: str):
+    with _CACHE_LOCK:
+        conn.execute("INSERT OR REPLACE INTO lists VALUES (?, ?, ?, ?, ?)", (url, etag, last_modified, html, time.time_ns()))
+
+def list_cache_drop(conn: sqlite3.Connection, url: str):
+    with _CACHE_LOCK:
+        conn.execute("DELETE FROM lists WHERE url = ?", (url,))
+
+def fetch_full(session: requests.Session, url: str) -> str:
+    with _http_slot():
+        r = session.get(url, timeout=TIMEOUT)
+    r.raise_for_status()
+    return r.text
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+\d+-(\d+)/(\d+)")
+
+def stream_until_match(session: requests.Session, url: str, pattern: re.Pattern, max_bytes: int = 16384):
+    """
+    상세 페이지를 앞에서부터 조금씩 받아 pattern을 찾음 → (match 또는 None, 받은 HTML, 전체 여부).
+    등록일 메타데이터는 문서 앞쪽에 있으므로 보통 첫 몇 KB 안에서 끝남.
+    Range(0~max_bytes)를 보내되, 서버가 무시(200)하면 본문을 끝까지 받음
+    (중간에 끊으면 keep-alive 연결을 버리게 되므로 매치 뒤 분량은 읽고 버림)
+    """
+    # 압축 스트림을 중간에서 자르지 않도록 비압축으로 요청
+    headers = {"Range": f"bytes=0-{max_bytes - 1}", "Accept-Encoding": "identity"}
+    with _http_slot(), session.get(url, headers=headers, timeout=TIMEOUT, stream=True) as r:
+        r.raise_for_status()
+        decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+        text, m = "", None
+        for chunk in r.iter_content(chunk_size=4096):
+            if m:
+                continue
+            start = max(0, len(text) - 64)  # 청크 경계에 걸친 매치도 찾도록 조금 겹쳐서 검색
+            text += decoder.decode(chunk)
+            m = pattern.search(text, start)
+        if not m:
+            text += decoder.decode(b"", final=True)
+        complete = r.status_code == 200
+        if r.status_code == 206:
+            # 짧은 문서는 206이어도 전체가 옴 (Content-Range: bytes 0-끝/전체크기)
+            cr = _CONTENT_RANGE_RE.match(r.headers.get("Content-Range", ""))
+            complete = bool(cr) and int(cr.group(1)) + 1 == int(cr.group(2))
+    return m, text, complete
+
+def get_detail(link: str, cache: sqlite3.Connection, since_kst: datetime, now_kst: datetime, summarize=None):
+    """
+    링크의 (등록시각, 요약)을 캐시에서 찾고, 없으면 상세 페이지를 받아 파싱 후 캐시에 저장.
+    요약은 summarize가 주어졌을 때 최근 24시간 글에만 만든다
+    (범위 밖 글은 이후 실행에서도 범위에 들어오지 않음).
+    """
+    hit = cache_get(cache, link)
+    if hit:
+        dt_kst = datetime.fromisoformat(hit["dt"])
+        summary = hit.get("summary")
+        if summarize is None or summary is not None or not since_kst <= dt_kst <= now_kst:
+            return dt_kst, summary
+
+    try:
+        if summarize:
+            # 요약할 본문 컨테이너는 문서 뒤쪽에 있을 수 있으므로 전체를 받음
+            html = fetch_full(SESSION, link)
+        else:
+            m, html, complete = stream_until_match(SESSION, link, _DATE_RE)
+            if not m and not complete:
+                # 받은 앞부분(206)에 등록일이 없으면 전체를 다시 받음
+                html = fetch_full(SESSION, link)
+        dt_kst = parse_detail_datetime_kst(html)
+    except Exception:
+        return None, None
+
+    if not dt_kst:
+        return None, None
+    summary = None
+    if summarize and since_kst <= dt_kst <= now_kst:
+        summary = summarize(html)
+    cache_put(cache, link, {"dt": dt_kst.isoformat(), "summary": summary})
+    return dt_kst, summary
+
+def fetch_detail(row: dict, section_name: str, since_kst: datetime, now_kst: datetime, cache: sqlite3.Connection, summarize=None):
+    """
+    등록시각 기준 최근 24시간 글이면 항목 dict, 아니면 None
+    """
+    dt_kst, summary = get_detail(row["link"], cache, since_kst, now_kst, summarize)
+    if not dt_kst:
+        return None
+    if since_kst <= dt_kst <= now_kst:
+        item = {
+            "dt": dt_kst,
+            "title": row["title"],
+            "link": row["link"],
+            "category": section_name
+        }
+        if summarize:
+            item["summary"] = summary
+        return item
+    return None
+
+def scan_list_page(section_code: str, page: int, now_kst: datetime, cache: sqlite3.Connection):
+    """
+    지정 섹션(분야) 목록 한 페이지에서 최근 24시간 후보 행을 고름 → (후보 행들, 다음 페이지 필요 여부).
+    목록에서 오늘/어제 글만 후보로 잡고, 상세에서 '등록일 시각'으로 최종 필터
+    """
+    params = {
+        "search_section": section_code,
+        "lcmspage": page,
+        "psize": 10,
+        # 기본 검색 파라미터는 페이지 네비게이션을 보면 자동으로 붙는 값들이 있으나 필수는 아님
+    }
+    soup = get_soup(urljoin(BASE, LIST_PATH), params=params, cache=cache, strainer=_LIST_STRAINER)
+    rows = parse_list_rows(soup)
+    if not rows:
+        return [], False
+
+    stop_paging = False
+    cutoff_date = (now_kst - timedelta(days=1)).date()
+    candidates = []
+    for row in rows:
+        # 목록은 날짜만 있으니 오늘/어제만 후보로
+        try:
+            row_date = _parse_ymd(row["date_str"])
+        except Exception:
+            row_date = None
+        if row_date and row_date < cutoff_date:
+            # 이 섹션은 최근 24시간 범위를 벗어난 날짜까지 내려왔으므로 다음 페이지 불필요
+            stop_paging = True
+            continue
+        candidates.append(row)
+    return candidates, not stop_paging
+
+def fetch_recent(wanted, since_kst: datetime, now_kst: datetime, cache: sqlite3.Connection, summarize=None, max_pages: int = 3):
+    """
+    wanted 분야들의 최근 24시간 글 수집.
+    1) 페이지 번호별로 남은 분야들의 목록을 동시에 받고
+    2) 링크 기준으로 분야 간 중복을 제거(처음 나온 분야로 분류)한 뒤
+    3) 상세 페이지는 한 번에 병렬로 확인 (동시 요청 수·초당 요청 수는 _http_slot()으로 제한)
+    """
+    queue = {}  # 링크 → (목록 행, 분야), 여러 분야에 있는 글도 상세는 한 번만 요청
+    active = list(wanted)
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as pool:
+        for page in range(1, max_pages + 1):
+            results = pool.map(lambda name: scan_list_page(CATEGORY_TO_SECTION[name], page, now_kst, cache), active)
+            next_active = []
+            for name, (rows, more) in zip(active, results):
+                for row in rows:
+                    queue.setdefault(row["link"], (row, name))
+                if more:
+                    next_active.append(name)
+            active = next_active
+            if not active:
+                break
+
+        entries = list(queue.values())
+        return [
+            item for item in pool.map(lambda e: fetch_detail(e[0], e[1], since_kst, now_kst, cache, summarize), entries)
+            if item
+        ]